@@ -10,14 +10,16 @@ For external/mobile app access, use HA OAuth tokens as Bearer tokens.
 """
 from flask import Flask, request, jsonify, send_file, render_template, send_from_directory
 from flask_cors import CORS
-from werkzeug.utils import secure_filename
 from functools import wraps
 import os
 import logging
+import shutil
+import tempfile
 import subprocess
 import socket
 import requests
 import threading
+import time
 import re
 import signal
 import json
@@ -44,8 +46,10 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', '/data/print_jobs')
-ALLOWED_EXTENSIONS = {'pdf', 'ps', 'txt', 'png', 'jpg', 'jpeg'}
+ALLOWED_EXTENSIONS = frozenset({'pdf', 'ps', 'txt', 'png', 'jpg', 'jpeg'})
 MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50MB max file size
+UPLOAD_MAX_AGE = 600  # Seconds before an uploaded file is reaped
+UPLOAD_REAP_INTERVAL = 60  # Seconds between upload folder scans
 
 # Home Assistant Supervisor API for token validation
 SUPERVISOR_TOKEN = os.environ.get('SUPERVISOR_TOKEN', '')
@@ -55,7 +59,37 @@ app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    ext = os.path.splitext(filename)[1][1:].casefold()
+    return bool(ext) and ext in ALLOWED_EXTENSIONS
+
+
+def reap_uploads():
+    """Remove uploaded files older than UPLOAD_MAX_AGE from UPLOAD_FOLDER.
+
+    Uploads are not deleted inline after submission, so CUPS can never
+    lose a file it has not finished reading.
+    """
+    cutoff = time.time() - UPLOAD_MAX_AGE
+    try:
+        with os.scandir(UPLOAD_FOLDER) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                except OSError as e:
+                    logger.debug(f"Failed to reap upload {entry.path}: {e}")
+    except OSError as e:
+        logger.warning(f"Failed to scan upload folder: {e}")
+
+
+def _upload_reaper():
+    """Background loop that periodically reaps old uploads."""
+    while True:
+        time.sleep(UPLOAD_REAP_INTERVAL)
+        reap_uploads()
+
+
+threading.Thread(target=_upload_reaper, daemon=True).start()
 
 
 def is_ingress_request():
@@ -178,10 +212,11 @@ def submit_print_job():
         return jsonify({'error': 'Printer name is required'}), 400
 
     try:
-        # Save file temporarily
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(filepath)
+        # Save file under a unique name so concurrent uploads never collide
+        ext = os.path.splitext(file.filename)[1][:8]
+        fd, filepath = tempfile.mkstemp(dir=UPLOAD_FOLDER, suffix=ext)
+        with os.fdopen(fd, 'wb') as out:
+            shutil.copyfileobj(file.stream, out, 1 << 20)
 
         # Submit print job
         options = {}
@@ -192,11 +227,9 @@ def submit_print_job():
         if 'quality' in request.form:
             options['print-quality'] = request.form['quality']
 
+        # The uploaded file is left for the upload reaper to remove
         job_id = queue_manager.submit_job(printer_name, filepath, options)
 
-        # Clean up file after submission
-        os.unlink(filepath)
-
         return jsonify({
             'job_id': job_id,
             'status': 'submitted',
@@ -205,8 +238,6 @@ def submit_print_job():
 
     except Exception as e:
         logger.error(f"Error submitting print job: {str(e)}")
-        if os.path.exists(filepath):
-            os.unlink(filepath)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/print/<int:job_id>/status', methods=['GET'])
@@ -786,16 +817,19 @@ def api_tunnel_status():
 # Helper Functions
 # ============================================================================
 
+# mDNS octal escapes (e.g. \\032) and the IPv4 host part of a printer URI
+_MDNS_ESCAPE_RE = re.compile(r'\\(\d{3})')
+_URI_IP_RE = re.compile(r'://([0-9.]+)[:/]')
+
 def decode_mdns_name(name):
     """Decode mDNS escaped names (e.g., \\032 -> space).
 
     Avahi/mDNS uses octal escape sequences for special characters.
     For example: HP\\032LaserJet -> HP LaserJet (\\032 is octal for space)
     """
-    import re
     def replace_octal(match):
         return chr(int(match.group(1), 8))
-    return re.sub(r'\\(\d{3})', replace_octal, name)
+    return _MDNS_ESCAPE_RE.sub(replace_octal, name)
 
 def discover_network_printers():
     """Discover printers on the network using avahi-browse.
@@ -812,8 +846,7 @@ def discover_network_printers():
     for p in existing_printers:
         uri = p.get('uri', '')
         # Extract IP from URI like ipp://192.168.1.100:631/...
-        import re
-        ip_match = re.search(r'://([0-9.]+)[:/]', uri)
+        ip_match = _URI_IP_RE.search(uri)
         if ip_match:
             existing_ips.add(ip_match.group(1))
 
@@ -933,8 +966,7 @@ def discover_network_printers():
                     if len(parts) >= 2:
                         uri = parts[1]
                         # Extract IP from URI for grouping
-                        import re
-                        ip_match = re.search(r'://([0-9.]+)[:/]', uri)
+                        ip_match = _URI_IP_RE.search(uri)
                         address = ip_match.group(1) if ip_match else uri
                         if address not in printers_by_ip:
                             printers_by_ip[address] = {
@@ -1048,22 +1080,15 @@ with the RelayPrint mobile app.
             date=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         )
 
-        # Save test page
-        test_file = os.path.join(UPLOAD_FOLDER, 'test_page.txt')
-        with open(test_file, 'w') as f:
-            f.write(test_content)
-
-        # Print using lp command
+        # Print using lp command, passing the page on stdin
         result = subprocess.run(
-            ['lp', '-d', printer_name, test_file],
+            ['lp', '-d', printer_name, '-t', 'RelayPrint Test Page'],
+            input=test_content,
             capture_output=True,
             text=True,
             timeout=10
         )
 
-        # Clean up
-        os.unlink(test_file)
-
         if result.returncode == 0:
             # Extract job ID from output
             job_id = None
@@ -7,6 +7,9 @@ import cups
 import json
 import logging
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
 
 # Configure logging
@@ -16,11 +19,31 @@ logging.basicConfig(
 )
 logger = logging.getLogger('printer_discovery')
 
+# device-uri schemes that identify network and locally attached queues.
+# Matched on the text before the first ':' since HPLIP URIs look like hp:/usb/...
+NETWORK_SCHEMES = frozenset({'socket', 'ipp', 'ipps', 'http', 'https', 'lpd'})
+LOCAL_SCHEMES = frozenset({'usb', 'parallel', 'serial', 'hp', 'hpfax'})
+
+# Seconds a printer's attributes are reused before CUPS is asked again
+ATTR_CACHE_TTL = 5
+
+# Upper bound on concurrent getPrinterAttributes requests during discovery
+ATTR_FETCH_WORKERS = 16
+
 class PrinterDiscovery:
     """Handles printer discovery and management via CUPS."""
     
     def __init__(self):
         """Initialize CUPS connection."""
+        self._attr_cache: Dict[str, tuple] = {}
+        # Threads are only started on first use and then kept, so each
+        # worker's CUPS connection is reused across discovery calls
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(
+            max_workers=ATTR_FETCH_WORKERS,
+            thread_name_prefix='cups-attrs',
+            initializer=self._init_worker
+        )
         try:
             self.conn = cups.Connection()
             logger.info("Successfully connected to CUPS server")
@@ -28,6 +51,24 @@ class PrinterDiscovery:
             logger.error(f"Failed to connect to CUPS server: {e}")
             sys.exit(1)
 
+    def _init_worker(self) -> None:
+        """Flag a discovery pool thread so it gets its own connection."""
+        self._local.worker = True
+
+    def _connection(self) -> cups.Connection:
+        """CUPS connection for the calling thread.
+
+        pycups connections must not be used by several threads at once,
+        so each discovery pool worker lazily opens and keeps its own.
+        Every other caller uses self.conn.
+        """
+        if not getattr(self._local, 'worker', False):
+            return self.conn
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = cups.Connection()
+        return conn
+
     def get_all_printers(self) -> Dict[str, Dict]:
         """Get all available printers and their attributes."""
         try:
@@ -38,38 +79,77 @@ class PrinterDiscovery:
             logger.error(f"Failed to get printers: {e}")
             return {}
 
+    @staticmethod
+    def format_attributes(printer_name: str, attrs: Dict,
+                          include_formats: bool = True) -> Dict:
+        """Convert raw CUPS printer attributes into the API representation.
+
+        Accepts either a full getPrinterAttributes() result or the
+        per-printer dict returned by getPrinters(); pass
+        include_formats=False to leave out supported_formats.
+        """
+        info = {
+            "name": printer_name,
+            "info": attrs.get("printer-info", ""),
+            "location": attrs.get("printer-location", ""),
+            "make_model": attrs.get("printer-make-and-model", ""),
+            "state": attrs.get("printer-state", 0),
+            "state_message": attrs.get("printer-state-message", ""),
+            "is_shared": attrs.get("printer-is-shared", False),
+            "uri": attrs.get("device-uri", "")
+        }
+        if include_formats:
+            info["supported_formats"] = attrs.get("document-format-supported", [])
+        return info
+
     def get_printer_attributes(self, printer_name: str) -> Dict:
-        """Get detailed attributes for a specific printer."""
+        """Get detailed attributes for a specific printer.
+
+        Results are cached for ATTR_CACHE_TTL seconds so that running both
+        discover_* methods in one refresh costs one IPP request per printer.
+        """
+        now = time.monotonic()
+        cached = self._attr_cache.get(printer_name)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
         try:
-            attrs = self.conn.getPrinterAttributes(printer_name)
-            return {
-                "name": printer_name,
-                "info": attrs.get("printer-info", ""),
-                "location": attrs.get("printer-location", ""),
-                "make_model": attrs.get("printer-make-and-model", ""),
-                "state": attrs.get("printer-state", 0),
-                "state_message": attrs.get("printer-state-message", ""),
-                "is_shared": attrs.get("printer-is-shared", False),
-                "uri": attrs.get("device-uri", ""),
-                "supported_formats": attrs.get("document-format-supported", [])
-            }
+            attrs = self.format_attributes(
+                printer_name, self._connection().getPrinterAttributes(printer_name))
         except Exception as e:
             logger.error(f"Failed to get attributes for printer {printer_name}: {e}")
             return {}
+        self._attr_cache[printer_name] = (now + ATTR_CACHE_TTL, attrs)
+        return attrs
+
+    def clear_cache(self) -> None:
+        """Forget cached printer attributes."""
+        self._attr_cache.clear()
+
+    def _fetch_attributes(self, names: List[str]) -> List[Dict]:
+        """Get attributes for several printers concurrently, in input order.
+
+        Printers that could not be queried are left out.
+        """
+        if len(names) > 1:
+            results = list(self._executor.map(self.get_printer_attributes, names))
+        else:
+            results = [self.get_printer_attributes(name) for name in names]
+        return [attrs for attrs in results if attrs]
 
     def discover_network_printers(self) -> List[Dict]:
         """Discover network printers using CUPS browsing."""
         try:
             # Get list of network-connected printers
             printers = self.get_all_printers()
-            network_printers = []
-            
-            for name, data in printers.items():
-                if data.get('device-uri', '').startswith(('socket:', 'ipp:', 'ipps:', 'http:', 'https:')):
-                    attrs = self.get_printer_attributes(name)
-                    if attrs:
-                        network_printers.append(attrs)
-            
+
+            # Filter on the URI from getPrinters() so attributes are only
+            # fetched for matching queues
+            network_printers = self._fetch_attributes([
+                name for name, data in printers.items()
+                if data.get('device-uri', '').partition(':')[0] in NETWORK_SCHEMES
+            ])
+
             logger.info(f"Discovered {len(network_printers)} network printer(s)")
             return network_printers
         except Exception as e:
@@ -80,14 +160,11 @@ class PrinterDiscovery:
         """Discover locally connected printers (USB, parallel, etc.)."""
         try:
             printers = self.get_all_printers()
-            local_printers = []
-            
-            for name, data in printers.items():
-                if data.get('device-uri', '').startswith(('usb:', 'parallel:', 'serial:')):
-                    attrs = self.get_printer_attributes(name)
-                    if attrs:
-                        local_printers.append(attrs)
-            
+            local_printers = self._fetch_attributes([
+                name for name, data in printers.items()
+                if data.get('device-uri', '').partition(':')[0] in LOCAL_SCHEMES
+            ])
+
             logger.info(f"Discovered {len(local_printers)} local printer(s)")
             return local_printers
         except Exception as e:
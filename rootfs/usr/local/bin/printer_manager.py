@@ -3,8 +3,9 @@
 Printer management web interface for RelayPrint.
 Provides a REST API and web UI for managing printers.
 """
-import os
 import json
+from collections import defaultdict
+from datetime import datetime
 from flask import Flask, render_template, jsonify, request, send_from_directory
 from printer_discovery import PrinterDiscovery
 
@@ -15,6 +16,18 @@ app = Flask(__name__,
 # Initialize printer discovery
 printer_discovery = PrinterDiscovery()
 
+# CUPS job states to progress percentages, indexed by job-state (3-9)
+_STATE_PROGRESS = (
+    0, 0, 0,
+    0,    # 3: Pending
+    25,   # 4: Held
+    50,   # 5: Processing
+    75,   # 6: Stopped
+    90,   # 7: Canceled
+    95,   # 8: Aborted
+    100   # 9: Completed
+)
+
 @app.route('/')
 def index():
     """Render the main printer management interface."""
@@ -29,32 +42,34 @@ def send_static(path):
 def get_printers():
     """Get all printers and their status."""
     try:
-        # Get all printers
+        # Get all printers; getPrinters() already carries the fields we show
         all_printers = printer_discovery.get_all_printers()
+
+        # Fetch active jobs once and group them by printer name
+        jobs_by_printer = defaultdict(list)
+        try:
+            jobs = printer_discovery.conn.getJobs(
+                which_jobs='active',
+                requested_attributes=['job-name', 'job-id', 'job-state', 'job-printer-uri']
+            )
+            for job_id, job_info in jobs.items():
+                printer_name = job_info.get('job-printer-uri', '').rsplit('/', 1)[-1]
+                jobs_by_printer[printer_name].append({
+                    'id': job_id,
+                    'name': job_info.get('job-name', ''),
+                    'progress': calculate_job_progress(job_info.get('job-state', 0))
+                })
+        except Exception as e:
+            app.logger.error(f"Failed to get active jobs: {e}")
+
         printers_list = []
-        
-        # Get detailed information for each printer
-        for name in all_printers:
-            printer_info = printer_discovery.get_printer_attributes(name)
-            if printer_info:
-                # Add active jobs if any
-                try:
-                    jobs = printer_discovery.conn.getJobs(which_jobs='active', requested_attributes=['job-name', 'job-id', 'job-state'])
-                    printer_jobs = [
-                        {
-                            'id': job_id,
-                            'name': job_info['job-name'],
-                            'progress': calculate_job_progress(job_info['job-state'])
-                        }
-                        for job_id, job_info in jobs.items()
-                        if job_info.get('job-printer-uri', '').endswith(f'/{name}')
-                    ]
-                    printer_info['active_jobs'] = printer_jobs
-                except Exception as e:
-                    app.logger.error(f"Failed to get jobs for printer {name}: {e}")
-                    printer_info['active_jobs'] = []
-                
-                printers_list.append(printer_info)
+        for name, attrs in all_printers.items():
+            # getPrinters() does not report document-format-supported, and
+            # the dashboard never showed it, so formats are left out
+            printer_info = PrinterDiscovery.format_attributes(
+                name, attrs, include_formats=False)
+            printer_info['active_jobs'] = jobs_by_printer.get(name, [])
+            printers_list.append(printer_info)
         
         return jsonify({'printers': printers_list})
     except Exception as e:
@@ -65,7 +80,6 @@ def get_printers():
 def test_print(name):
     """Send a test page to the specified printer."""
     try:
-        # Create a test page file
         test_page = f"""
         RelayPrint Test Page
         ===================
@@ -73,14 +87,22 @@ def test_print(name):
         Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
         
         If you can read this, your printer is working correctly!
-        """
-        test_file = '/tmp/test_page.txt'
-        with open(test_file, 'w') as f:
-            f.write(test_page)
-        
-        # Send to printer
-        job_id = printer_discovery.conn.printFile(name, test_file, "RelayPrint Test Page", {})
-        os.remove(test_file)
+        """.encode()
+
+        # Stream the page to CUPS directly instead of via a temp file
+        conn = printer_discovery.conn
+        job_id = conn.createJob(name, "RelayPrint Test Page", {})
+        try:
+            conn.startDocument(name, job_id, "test_page.txt", "text/plain", 1)
+            conn.writeRequestData(test_page, len(test_page))
+            conn.finishDocument(name)
+        except Exception:
+            # Don't leave an open, document-less job behind in CUPS
+            try:
+                conn.cancelJob(job_id)
+            except Exception as cancel_error:
+                app.logger.error(f"Failed to cancel test job {job_id}: {cancel_error}")
+            raise
         
         return jsonify({'success': True, 'job_id': job_id})
     except Exception as e:
@@ -106,17 +128,9 @@ def add_printer():
 
 def calculate_job_progress(job_state):
     """Calculate job progress percentage based on state."""
-    # Map CUPS job states to progress percentages
-    state_progress = {
-        3: 0,    # Pending
-        4: 25,   # Held
-        5: 50,   # Processing
-        6: 75,   # Stopped
-        7: 90,   # Canceled
-        8: 95,   # Aborted
-        9: 100   # Completed
-    }
-    return state_progress.get(job_state, 0)
+    if 0 <= job_state < len(_STATE_PROGRESS):
+        return _STATE_PROGRESS[job_state]
+    return 0
 
 if __name__ == '__main__':
     # In production, this will be behind a reverse proxy
@@ -1,186 +1,307 @@
 #!/usr/bin/env python3
+import io
 import os
 import sys
-import json
+import functools
+import logging
 import time
+import random
+import pytest
 import requests
+import requests_mock
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from requests_toolbelt.multipart.encoder import MultipartEncoder
+from urllib3.util.retry import Retry
 from pathlib import Path
 
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+# (connect, read) timeout applied to every API call
+REQUEST_TIMEOUT = (3.05, 15)
+
+TEST_PDF_PATH = Path(__file__).resolve().parent.parent / 'test_data' / 'test.pdf'
+
+DEFAULT_BASE_URL = 'http://localhost:8080'
+
+# Without PRINTER_RELAY_URL the read-only checks run against canned responses
+LIVE_API = 'PRINTER_RELAY_URL' in os.environ
+
+# Read-only checks only count as integration tests when they hit a live add-on
+read_only = pytest.mark.integration if LIVE_API else pytest.mark.unit
+
+log = logging.getLogger('printer_relay_test')
+
+@functools.lru_cache(maxsize=1)
+def _test_pdf_bytes():
+    """Contents of the test PDF, read from disk once"""
+    return TEST_PDF_PATH.read_bytes()
+
+def _json(response):
+    """Decode a JSON response body straight from its raw bytes"""
+    return json_loads(response.content)
+
 class PrinterRelayTester:
     def __init__(self):
-        self.base_url = os.getenv('PRINTER_RELAY_URL', 'http://localhost:8080')
+        self.base_url = os.getenv('PRINTER_RELAY_URL', DEFAULT_BASE_URL)
         self.auth_token = None
         self.test_printer = 'PDF'  # We'll use CUPS-PDF as our test printer
+
+        # Reuse one connection pool for every API call
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            # Only GETs are retried after the request was sent: a print
+            # submission is not idempotent and its streamed body can't be replayed
+            max_retries=Retry(total=3, connect=3, read=2,
+                              backoff_factor=0.3, backoff_jitter=0.2,
+                              status_forcelist=[429, 500, 502, 503, 504],
+                              allowed_methods=['GET'],
+                              raise_on_status=False)
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'User-Agent': 'RelayPrint-IntegrationTest'})
         
+    def _request(self, method, path, **kwargs):
+        """Call an API path on the shared session with the default timeout"""
+        kwargs.setdefault('timeout', REQUEST_TIMEOUT)
+        return self.session.request(method, f"{self.base_url}{path}", **kwargs)
+
     def setup(self):
         """Setup test environment"""
-        print("🔧 Setting up test environment...")
+        log.info("Setting up test environment...")
         
         # Check if Home Assistant add-on is running
         try:
-            response = requests.get(f"{self.base_url}/api/health")
+            response = self._request('GET', '/api/health')
             if response.status_code != 200:
-                print("❌ Home Assistant add-on is not running!")
+                log.error("Home Assistant add-on is not running!")
                 return False
-            print("✅ Home Assistant add-on is running")
+            log.info("Home Assistant add-on is running")
         except requests.exceptions.ConnectionError:
-            print("❌ Cannot connect to Home Assistant add-on!")
+            log.error("Cannot connect to Home Assistant add-on!")
             return False
 
         # Authenticate
         try:
-            response = requests.post(
-                f"{self.base_url}/api/auth",
+            response = self._request(
+                'POST', '/api/auth',
                 auth=('admin', 'admin')  # Default test credentials
             )
             if response.status_code == 200:
-                self.auth_token = response.json()['token']
-                print("✅ Authentication successful")
+                self.auth_token = _json(response)['token']
+                self.session.headers.update({'Authorization': f'Bearer {self.auth_token}'})
+                log.info("Authentication successful")
             else:
-                print("❌ Authentication failed!")
+                log.error("Authentication failed!")
                 return False
         except Exception as e:
-            print(f"❌ Authentication error: {e}")
+            log.error("Authentication error: %s", e)
             return False
 
         return True
 
-    def test_printer_discovery(self):
+    def _batch_get(self, paths):
+        """GET several API paths in parallel over the shared session pool"""
+        with ThreadPoolExecutor(max_workers=len(paths)) as executor:
+            return list(executor.map(lambda path: self._request('GET', path), paths))
+
+    def test_printer_discovery(self, response=None):
         """Test printer discovery"""
-        print("\n🔍 Testing printer discovery...")
+        log.info("Testing printer discovery...")
         
-        headers = {'Authorization': f'Bearer {self.auth_token}'}
-        response = requests.get(f"{self.base_url}/api/printers", headers=headers)
+        if response is None:
+            response = self._request('GET', '/api/printers')
         
         if response.status_code != 200:
-            print("❌ Failed to list printers!")
+            log.error("Failed to list printers!")
             return False
             
-        printers = response.json().get('printers', [])
+        printers = _json(response).get('printers', [])
         if not printers:
-            print("❌ No printers found!")
+            log.error("No printers found!")
             return False
             
-        print(f"✅ Found {len(printers)} printer(s):")
+        log.info("Found %d printer(s):", len(printers))
         for printer in printers:
-            print(f"  - {printer['name']} ({printer['status']})")
+            log.info("  - %s (%s)", printer['name'], printer['status'])
             
         return True
 
     def test_print_job(self):
         """Test submitting a print job"""
-        print("\n📄 Testing print job submission...")
-        
-        # Create a test PDF
-        test_pdf_path = "tests/test_data/test.pdf"
+        log.info("Testing print job submission...")
         
-        headers = {
-            'Authorization': f'Bearer {self.auth_token}'
-        }
-        
-        # Submit print job
-        with open(test_pdf_path, 'rb') as pdf:
-            files = {
-                'file': ('test.pdf', pdf, 'application/pdf')
-            }
-            data = {
-                'printer_name': self.test_printer,
-                'copies': '1',
-                'duplex': 'false'
-            }
-            response = requests.post(
-                f"{self.base_url}/api/print",
-                headers=headers,
-                files=files,
-                data=data
-            )
+        # Submit print job, streaming the multipart body
+        form = MultipartEncoder(fields={
+            'file': ('test.pdf', io.BytesIO(_test_pdf_bytes()), 'application/pdf'),
+            'printer_name': self.test_printer,
+            'copies': '1',
+            'duplex': 'false'
+        })
+        response = self._request(
+            'POST', '/api/print',
+            data=form,
+            headers={'Content-Type': form.content_type}
+        )
         
         if response.status_code != 200:
-            print(f"❌ Failed to submit print job: {response.text}")
+            log.error("Failed to submit print job: %s", response.text)
             return False
             
-        job_id = response.json()['job_id']
-        print(f"✅ Print job submitted (ID: {job_id})")
+        job_id = _json(response)['job_id']
+        log.info("Print job submitted (ID: %s)", job_id)
         
         # Monitor job status
-        print("\n⏳ Monitoring job status...")
-        max_attempts = 30
-        attempt = 0
+        log.info("Monitoring job status...")
+        status = None
+        delay = 0.1
+        deadline = time.monotonic() + 60
         
-        while attempt < max_attempts:
-            response = requests.get(
-                f"{self.base_url}/api/print/{job_id}/status",
-                headers=headers
-            )
+        while time.monotonic() < deadline:
+            response = self._request('GET', f"/api/print/{job_id}/status")
             
             if response.status_code != 200:
-                print(f"❌ Failed to get job status: {response.text}")
+                log.error("Failed to get job status: %s", response.text)
                 return False
                 
-            status = response.json()['status']
-            print(f"  Status: {status}")
+            status = _json(response)['status']
+            log.info("  Status: %s", status)
             
             if status in ['completed', 'failed']:
                 break
                 
-            time.sleep(2)
-            attempt += 1
+            # Exponential backoff with 20% jitter, capped at 4s
+            time.sleep(delay + random.uniform(0, delay * 0.2))
+            delay = min(delay * 2, 4.0)
         
         if status == 'completed':
-            print("✅ Print job completed successfully")
+            log.info("Print job completed successfully")
             return True
         else:
-            print("❌ Print job failed or timed out")
+            log.error("Print job failed or timed out")
             return False
 
-    def test_queue_status(self):
+    def test_queue_status(self, response=None):
         """Test queue status"""
-        print("\n📊 Testing queue status...")
+        log.info("Testing queue status...")
         
-        headers = {'Authorization': f'Bearer {self.auth_token}'}
-        response = requests.get(f"{self.base_url}/api/queue/status", headers=headers)
+        if response is None:
+            response = self._request('GET', '/api/queue/status')
         
         if response.status_code != 200:
-            print("❌ Failed to get queue status!")
+            log.error("Failed to get queue status!")
             return False
             
-        status = response.json()
-        print(f"✅ Queue status:")
-        print(f"  Active jobs: {status['active_jobs']}")
-        print(f"  Queued jobs: {status['queued_jobs']}")
-        print(f"  Completed jobs: {status['completed_jobs']}")
+        status = _json(response)
+        log.info("Queue status:")
+        log.info("  Active jobs: %s", status['active_jobs'])
+        log.info("  Queued jobs: %s", status['queued_jobs'])
+        log.info("  Completed jobs: %s", status['completed_jobs'])
         
         return True
 
     def run_all_tests(self):
         """Run all tests"""
-        if not self.setup():
-            return False
+        try:
+            if not self.setup():
+                return False
+                
+            # The tests are I/O-bound and independent, so the print job is
+            # polled in the background while both read-only probes are
+            # fetched together and checked
+            results = []
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                print_job = executor.submit(self.test_print_job)
+
+                try:
+                    printers_response, queue_response = self._batch_get(
+                        ['/api/printers', '/api/queue/status']
+                    )
+                    probes = [
+                        lambda: self.test_printer_discovery(printers_response),
+                        lambda: self.test_queue_status(queue_response)
+                    ]
+                except Exception as e:
+                    log.error("Failed to fetch printers and queue status: %s", e)
+                    probes = []
+                    results.extend([False, False])
+
+                for probe in probes:
+                    try:
+                        results.append(probe())
+                    except Exception as e:
+                        log.error("Test failed with error: %s", e)
+                        results.append(False)
+
+                try:
+                    results.append(print_job.result())
+                except Exception as e:
+                    log.error("Test failed with error: %s", e)
+                    results.append(False)
             
-        tests = [
-            self.test_printer_discovery,
-            self.test_print_job,
-            self.test_queue_status
-        ]
-        
-        results = []
-        for test in tests:
-            try:
-                result = test()
-                results.append(result)
-            except Exception as e:
-                print(f"❌ Test failed with error: {e}")
-                results.append(False)
-        
-        print("\n📝 Test Summary:")
-        print(f"Total tests: {len(results)}")
-        print(f"Passed: {results.count(True)}")
-        print(f"Failed: {results.count(False)}")
-        
-        return all(results)
+            log.info("Test Summary:")
+            log.info("Total tests: %d", len(results))
+            log.info("Passed: %d", results.count(True))
+            log.info("Failed: %d", results.count(False))
+            
+            return all(results)
+        finally:
+            self.session.close()
+
+@pytest.fixture(scope="module")
+def fake_api():
+    """Serve canned /api/* responses unless a live add-on is configured."""
+    if LIVE_API:
+        yield None
+        return
+
+    with requests_mock.Mocker() as mocker:
+        mocker.get(f"{DEFAULT_BASE_URL}/api/health", json={'status': 'healthy'})
+        mocker.post(f"{DEFAULT_BASE_URL}/api/auth", json={'token': 'test-token'})
+        mocker.get(f"{DEFAULT_BASE_URL}/api/printers", json={
+            'printers': [{'name': 'PDF', 'status': 'idle'}]
+        })
+        mocker.get(f"{DEFAULT_BASE_URL}/api/queue/status", json={
+            'active_jobs': 0,
+            'queued_jobs': 0,
+            'completed_jobs': 1
+        })
+        yield mocker
+
+@pytest.fixture(scope="module")
+def tester(fake_api):
+    """PrinterRelayTester with an authenticated session, shared by this module."""
+    tester = PrinterRelayTester()
+    if not tester.setup():
+        tester.session.close()
+        pytest.fail(f"Cannot use RelayPrint add-on at {tester.base_url}")
+    yield tester
+    tester.session.close()
+
+@read_only
+def test_printer_discovery(tester):
+    assert tester.test_printer_discovery()
+
+@pytest.mark.integration
+@pytest.mark.slow
+def test_print_job(tester):
+    if not LIVE_API:
+        pytest.skip("printing needs a live add-on; set PRINTER_RELAY_URL")
+    assert tester.test_print_job()
+
+@read_only
+def test_queue_status(tester):
+    assert tester.test_queue_status()
 
 def main():
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     tester = PrinterRelayTester()
     success = tester.run_all_tests()
     sys.exit(0 if success else 1)
@@ -1,109 +1,159 @@
 #!/usr/bin/env python3
 """Unit tests for RelayPrint Server configuration validation."""
-import json
 import os
+import re
 import unittest
+import pytest
 import yaml
+from jsonschema import Draft7Validator
+from pathlib import Path
 from typing import Dict, Any
 
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+pytestmark = pytest.mark.config
+
+
+def is_int_range(schema_type):
+    return schema_type.startswith('int(')
+
+# (dotted field path in config.json, expected type / predicate / value)
+CONFIG_CHECKS = [
+    # Basic structure
+    ('name', str),
+    ('version', str),
+    ('slug', str),
+    ('description', str),
+    ('options', dict),
+    ('schema', dict),
+    ('arch', lambda arch: {'aarch64', 'amd64', 'armhf', 'armv7', 'i386'}.issubset(arch)),
+    # Ports: CUPS, Avahi, RelayPrint API (for mobile app)
+    ('ports', {'631/tcp': 631, '5353/udp': 5353, '7779/tcp': 7779}),
+    # CUPS admin credentials
+    ('options.cups_admin_user', str),
+    ('options.cups_admin_password', str),
+    ('schema.cups_admin_user', 'str'),
+    ('schema.cups_admin_password', 'password'),
+    # Printer options
+    ('options.printer_options.default_media', str),
+    ('options.printer_options.color_mode', str),
+    ('options.printer_options.duplex', bool),
+    ('schema.printer_options.default_media', str),
+    ('schema.printer_options.color_mode', str),
+    ('schema.printer_options.duplex', str),
+    # Advanced options are bounded integers
+    ('schema.advanced.cups_timeout', is_int_range),
+    ('schema.advanced.job_retention', is_int_range),
+    ('schema.advanced.max_jobs', is_int_range),
+    # Ingress (HA Ingress proxy handles authentication and SSL)
+    ('ingress', True),
+    ('ingress_port', 7779),
+]
+
+
+def lookup(config, path):
+    """Resolve a dotted field path such as 'options.advanced.max_jobs'."""
+    for key in path.split('.'):
+        config = config[key]
+    return config
+
+# JSON Schema equivalents of Home Assistant add-on option types
+HA_TYPES = {
+    'str': {'type': 'string'},
+    'password': {'type': 'string'},
+    'email': {'type': 'string', 'format': 'email'},
+    'url': {'type': 'string', 'format': 'uri'},
+    'bool': {'type': 'boolean'},
+    'int': {'type': 'integer'},
+    'float': {'type': 'number'},
+    'port': {'type': 'integer', 'minimum': 1, 'maximum': 65535},
+}
+HA_TYPE_RE = re.compile(r'(\w+)(?:\((.*)\))?')
+
+
+def ha_schema_to_json_schema(schema: Any) -> Dict[str, Any]:
+    """Translate a Home Assistant add-on schema into a JSON Schema.
+
+    Handles nested dicts, [item] lists, list(a|b) enums, int/float ranges,
+    match(regex) and the optional '?' suffix.
+    """
+    if isinstance(schema, dict):
+        properties = {}
+        required = []
+        for key, value in schema.items():
+            if isinstance(value, str) and value.endswith('?'):
+                value = value[:-1]
+            else:
+                required.append(key)
+            properties[key] = ha_schema_to_json_schema(value)
+        return {
+            'type': 'object',
+            'properties': properties,
+            'required': required,
+            'additionalProperties': False
+        }
+    if isinstance(schema, list):
+        return {'type': 'array', 'items': ha_schema_to_json_schema(schema[0])}
+
+    name, args = HA_TYPE_RE.fullmatch(schema).groups()
+    if name == 'list':
+        return {'enum': args.split('|')}
+    if name == 'match':
+        return {'type': 'string', 'pattern': args}
+    json_schema = dict(HA_TYPES[name])
+    if name in ('int', 'float') and args:
+        low, _, high = args.partition(',')
+        if low:
+            json_schema['minimum'] = float(low) if name == 'float' else int(low)
+        if high:
+            json_schema['maximum'] = float(high) if name == 'float' else int(high)
+    return json_schema
+
 class TestConfigValidation(unittest.TestCase):
     """Test cases for configuration validation."""
 
-    def setUp(self):
-        """Load configuration files before tests."""
+    @classmethod
+    def setUpClass(cls):
+        """Load configuration files once for all tests."""
         # Load config.json
-        with open('config.json', 'r') as f:
-            self.config_json = json.load(f)
+        cls.config_json = json_loads(Path('config.json').read_bytes())
         
-        # Load config.yaml
-        with open('config.yaml', 'r') as f:
-            self.config_yaml = yaml.safe_load(f)
-
-    def test_basic_config_structure(self):
-        """Test basic configuration structure."""
-        required_fields = [
-            'name', 'version', 'slug', 'description', 'arch',
-            'ports', 'options', 'schema'
-        ]
-        for field in required_fields:
-            self.assertIn(field, self.config_json)
-
-    def test_architecture_support(self):
-        """Test architecture configuration."""
-        required_arch = ['aarch64', 'amd64', 'armhf', 'armv7', 'i386']
-        self.assertTrue(all(arch in self.config_json['arch'] for arch in required_arch))
-
-    def test_port_configuration(self):
-        """Test port configuration."""
-        required_ports = {
-            '631/tcp': 631,  # CUPS
-            '5353/udp': 5353,  # Avahi
-            '7779/tcp': 7779  # RelayPrint API (for mobile app)
-        }
-        self.assertEqual(self.config_json['ports'], required_ports)
+        # Load config.yaml, preferring the libyaml C loader when available
+        cls.config_yaml = yaml.load(Path('config.yaml').read_bytes(), Loader=YAML_LOADER)
+
+        # Compile the add-on options schema once
+        cls.options_validator = Draft7Validator(ha_schema_to_json_schema(cls.config_json['schema']))
+
+    def test_config_matrix(self):
+        """Test config.json fields and their config.yaml counterparts."""
+        for field, check in CONFIG_CHECKS:
+            with self.subTest(field=field):
+                value = lookup(self.config_json, field)
+                if isinstance(check, type):
+                    self.assertIsInstance(value, check)
+                elif callable(check):
+                    self.assertTrue(check(value), f"{field} = {value!r}")
+                else:
+                    self.assertEqual(value, check)
+
+        # UI configuration in config.yaml must agree with config.json
+        for field in ('name', 'version'):
+            with self.subTest(file='config.yaml', field=field):
+                self.assertEqual(self.config_yaml[field], self.config_json[field])
+        for field in ('ingress', 'panel_icon'):
+            with self.subTest(file='config.yaml', field=field):
+                self.assertIn(field, self.config_yaml)
 
     def test_options_schema_match(self):
         """Test that options match their schema definitions."""
-        options = self.config_json['options']
-        schema = self.config_json['schema']
-        
-        def validate_against_schema(options: Dict[str, Any], schema: Dict[str, Any], path: str = '') -> bool:
-            for key, value in options.items():
-                schema_key = f"{path}{key}" if path else key
-                self.assertIn(key, schema, f"Option {schema_key} not found in schema")
-                
-                if isinstance(value, dict):
-                    self.assertTrue(isinstance(schema[key], dict),
-                                 f"Schema mismatch for {schema_key}")
-                    validate_against_schema(value, schema[key], f"{key}.")
-                elif isinstance(value, list):
-                    self.assertTrue(isinstance(schema[key], list) or 
-                                 schema[key].startswith('list('),
-                                 f"Schema mismatch for {schema_key}")
-            return True
-
-        self.assertTrue(validate_against_schema(options, schema))
-
-    def test_cups_admin_configuration(self):
-        """Test CUPS admin configuration."""
-        self.assertIn('cups_admin_user', self.config_json['options'])
-        self.assertIn('cups_admin_password', self.config_json['options'])
-
-        self.assertEqual(self.config_json['schema']['cups_admin_user'], 'str')
-        self.assertEqual(self.config_json['schema']['cups_admin_password'], 'password')
-
-    def test_printer_options(self):
-        """Test printer-specific options."""
-        options = self.config_json['options']['printer_options']
-        schema = self.config_json['schema']['printer_options']
-        
-        required_options = ['default_media', 'color_mode', 'duplex']
-        for option in required_options:
-            self.assertIn(option, options)
-            self.assertIn(option, schema)
-
-    def test_advanced_options(self):
-        """Test advanced configuration options."""
-        options = self.config_json['options']['advanced']
-        schema = self.config_json['schema']['advanced']
-        
-        # Test numeric ranges
-        self.assertTrue(schema['cups_timeout'].startswith('int('))
-        self.assertTrue(schema['job_retention'].startswith('int('))
-        self.assertTrue(schema['max_jobs'].startswith('int('))
-
-    def test_ingress_configuration(self):
-        """Test ingress configuration (security handled by HA Ingress proxy)."""
-        # HA Ingress handles authentication and SSL, so we just verify ingress is enabled
-        self.assertTrue(self.config_json.get('ingress', False))
-        self.assertEqual(self.config_json.get('ingress_port'), 7779)
-
-    def test_yaml_ui_configuration(self):
-        """Test UI configuration in config.yaml."""
-        self.assertEqual(self.config_yaml['name'], self.config_json['name'])
-        self.assertEqual(self.config_yaml['version'], self.config_json['version'])
-        self.assertTrue('ingress' in self.config_yaml)
-        self.assertTrue('panel_icon' in self.config_yaml)
+        errors = sorted(self.options_validator.iter_errors(self.config_json['options']),
+                        key=lambda e: list(e.path))
+        self.assertEqual([f"{'.'.join(map(str, e.path))}: {e.message}" for e in errors], [])
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -1,100 +1,98 @@
 #!/usr/bin/env python3
 import unittest
+import pytest
 import cups
 import os
 import time
 import subprocess
+import uuid
 from pathlib import Path
 from contextlib import contextmanager
 
-class TestCUPSIntegration(unittest.TestCase):
-    @classmethod
-    def setUpClass(cls):
-        """Start CUPS server and wait for it to be ready."""
-        # Create test directories
-        os.makedirs("/tmp/cups-test/run", exist_ok=True)
-        os.makedirs("/tmp/cups-test/log", exist_ok=True)
-        os.makedirs("/tmp/cups-test/spool", exist_ok=True)
-
-        # Start CUPS with test configuration
-        cls.cups_process = subprocess.Popen([
-            "cupsd",
-            "-c", "tests/test_data/cupsd-test.conf",
-            "-f"
-        ])
-        time.sleep(2)  # Wait for CUPS to start
-
-        # Initialize CUPS connection
-        cls.conn = cups.Connection()
-
-    @classmethod
-    def tearDownClass(cls):
-        """Stop CUPS server and cleanup."""
-        if cls.cups_process:
-            cls.cups_process.terminate()
-            cls.cups_process.wait()
+# Spawns a real cupsd, so only runs when selected with -m integration
+pytestmark = [pytest.mark.integration, pytest.mark.slow]
+
+# Minimal one-page PDF with a valid xref table
+TEST_PDF = (
+    b"%PDF-1.1\n"
+    b"1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\n"
+    b"2 0 obj\n<< /Type /Pages /Kids [3 0 R] /Count 1 >>\nendobj\n"
+    b"3 0 obj\n<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+    b"/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>\nendobj\n"
+    b"4 0 obj\n<< /Length 41 >>\nstream\n"
+    b"BT /F1 24 Tf 100 700 Td (Test Page) Tj ET\nendstream\nendobj\n"
+    b"5 0 obj\n<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>\nendobj\n"
+    b"xref\n0 6\n"
+    b"0000000000 65535 f \n"
+    b"0000000009 00000 n \n"
+    b"0000000058 00000 n \n"
+    b"0000000115 00000 n \n"
+    b"0000000241 00000 n \n"
+    b"0000000332 00000 n \n"
+    b"trailer\n<< /Size 6 /Root 1 0 R >>\nstartxref\n402\n%%EOF\n"
+)
+
+# How long to wait for cupsd to accept connections, in seconds
+CUPSD_STARTUP_TIMEOUT = 5
+
+# Upper bound for a job to reach an expected state, in seconds
+JOB_STATE_TIMEOUT = 10
+
+@pytest.fixture(scope="session")
+def cups_server():
+    """Start CUPS server once per run and wait until it accepts connections."""
+    # Create test directories
+    os.makedirs("/tmp/cups-test/run", exist_ok=True)
+    os.makedirs("/tmp/cups-test/log", exist_ok=True)
+    os.makedirs("/tmp/cups-test/spool", exist_ok=True)
+
+    # Start CUPS with test configuration
+    cups_process = subprocess.Popen([
+        "cupsd",
+        "-c", "tests/test_data/cupsd-test.conf",
+        "-f"
+    ])
+    try:
+        # Poll for readiness instead of sleeping a fixed amount
+        deadline = time.monotonic() + CUPSD_STARTUP_TIMEOUT
+        while True:
+            try:
+                conn = cups.Connection()
+                break
+            except RuntimeError:
+                if cups_process.poll() is not None or time.monotonic() > deadline:
+                    raise
+                time.sleep(0.01)
+
+        yield conn
+    finally:
+        # Stop CUPS server
+        cups_process.terminate()
+        try:
+            cups_process.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            cups_process.kill()
+            cups_process.wait()
+
+@pytest.fixture(scope="session")
+def test_pdf_path():
+    """Write the test PDF once per run."""
+    path = Path("tests/test_data/test_print.pdf")
+    path.write_bytes(TEST_PDF)
+    return path
+
+@pytest.fixture(scope="class", autouse=True)
+def cups_connection(request, cups_server, test_pdf_path):
+    """Expose the shared CUPS connection and test PDF to the test class."""
+    request.cls.conn = cups_server
+    request.cls.pdf_file = str(test_pdf_path)
 
+class TestCUPSIntegration(unittest.TestCase):
     def setUp(self):
-        """Setup test environment."""
-        self.test_printer_name = "test_printer"
-        self.pdf_file = "tests/test_data/test_print.pdf"
-
-        # Create test PDF if it doesn't exist
-        if not os.path.exists(self.pdf_file):
-            Path(self.pdf_file).write_text("""
-            %PDF-1.1
-            1 0 obj
-            <<
-              /Type /Catalog
-              /Pages 2 0 R
-            >>
-            endobj
-            2 0 obj
-            <<
-              /Type /Pages
-              /Kids [3 0 R]
-              /Count 1
-            >>
-            endobj
-            3 0 obj
-            <<
-              /Type /Page
-              /Parent 2 0 R
-              /MediaBox [0 0 612 792]
-              /Resources <<>>
-              /Contents 4 0 R
-            >>
-            endobj
-            4 0 obj
-            << /Length 44 >>
-            stream
-            BT
-            /F1 24 Tf
-            100 700 Td
-            (Test Page) Tj
-            ET
-            endstream
-            endobj
-            xref
-            0 5
-            0000000000 65535 f
-            0000000010 00000 n
-            0000000063 00000 n
-            0000000123 00000 n
-            0000000234 00000 n
-            trailer
-            <<
-              /Size 5
-              /Root 1 0 R
-            >>
-            startxref
-            327
-            %%EOF
-            """)
-
-    def test_01_add_printer(self):
-        """Test adding a new printer."""
-        # Add a PDF printer for testing
+        """Add a uniquely named printer so each test is independent."""
+        self.test_printer_name = f"test_printer_{uuid.uuid4().hex[:8]}"
+
+        # Add a raw printer for testing
         self.conn.addPrinter(
             self.test_printer_name,
             device="file:/dev/null",
@@ -102,16 +100,37 @@ class TestCUPSIntegration(unittest.TestCase):
             info="Test Printer",
             location="Test Location"
         )
-        
-        # Verify printer was added
-        printers = self.conn.getPrinters()
-        self.assertIn(self.test_printer_name, printers)
-        
+        self.addCleanup(self.remove_printer)
+
         # Enable the printer
         self.conn.enablePrinter(self.test_printer_name)
         self.conn.acceptJobs(self.test_printer_name)
 
-    def test_02_printer_attributes(self):
+    def remove_printer(self):
+        """Delete the test printer unless the test already did."""
+        try:
+            self.conn.deletePrinter(self.test_printer_name)
+        except cups.IPPError:
+            pass
+
+    def wait_for_job_state(self, job_id, state):
+        """Poll a job with exponential backoff until it reaches `state`."""
+        deadline = time.monotonic() + JOB_STATE_TIMEOUT
+        delay = 0.005
+        while True:
+            job = self.conn.getJobAttributes(job_id)
+            if job['job-state'] == state or time.monotonic() > deadline:
+                return job
+            time.sleep(delay)
+            delay = min(delay * 1.5, 0.1)
+
+    def test_add_printer(self):
+        """Test adding a new printer."""
+        # Verify the printer added in setUp is listed
+        printers = self.conn.getPrinters()
+        self.assertIn(self.test_printer_name, printers)
+
+    def test_printer_attributes(self):
         """Test getting printer attributes."""
         attrs = self.conn.getPrinterAttributes(self.test_printer_name)
         self.assertIsNotNone(attrs)
@@ -119,7 +138,7 @@ class TestCUPSIntegration(unittest.TestCase):
         self.assertEqual(attrs['printer-location'], "Test Location")
         self.assertEqual(attrs['printer-state'], 3)  # Idle
 
-    def test_03_print_job(self):
+    def test_print_job(self):
         """Test submitting and monitoring a print job."""
         # Submit print job
         job_id = self.conn.printFile(
@@ -136,17 +155,10 @@ class TestCUPSIntegration(unittest.TestCase):
         self.assertEqual(job['job-name'], "Test Job")
 
         # Wait for job to complete
-        max_wait = 10
-        while max_wait > 0:
-            job = self.conn.getJobAttributes(job_id)
-            if job['job-state'] in [9]:  # Completed
-                break
-            time.sleep(1)
-            max_wait -= 1
-        
+        job = self.wait_for_job_state(job_id, 9)
         self.assertEqual(job['job-state'], 9)  # Completed
 
-    def test_04_cancel_job(self):
+    def test_cancel_job(self):
         """Test canceling a print job."""
         # Submit a job
         job_id = self.conn.printFile(
@@ -160,10 +172,10 @@ class TestCUPSIntegration(unittest.TestCase):
         self.conn.cancelJob(job_id)
         
         # Verify job was canceled
-        job = self.conn.getJobAttributes(job_id)
+        job = self.wait_for_job_state(job_id, 7)
         self.assertEqual(job['job-state'], 7)  # Canceled
 
-    def test_05_printer_state(self):
+    def test_printer_state(self):
         """Test printer state changes."""
         # Disable printer
         self.conn.disablePrinter(self.test_printer_name)
@@ -175,7 +187,7 @@ class TestCUPSIntegration(unittest.TestCase):
         attrs = self.conn.getPrinterAttributes(self.test_printer_name)
         self.assertEqual(attrs['printer-state'], 3)  # Idle
 
-    def test_06_reject_jobs(self):
+    def test_reject_jobs(self):
         """Test rejecting jobs."""
         # Set printer to reject jobs
         self.conn.rejectJobs(self.test_printer_name)
@@ -189,14 +201,12 @@ class TestCUPSIntegration(unittest.TestCase):
                 {}
             )
         
-        # Reset to accept jobs
-        self.conn.acceptJobs(self.test_printer_name)
-
-    def test_07_delete_printer(self):
+    def test_delete_printer(self):
         """Test deleting a printer."""
         self.conn.deletePrinter(self.test_printer_name)
         printers = self.conn.getPrinters()
         self.assertNotIn(self.test_printer_name, printers)
 
 if __name__ == '__main__':
-    unittest.main() 
\ No newline at end of file
+    # conn and pdf_file come from pytest fixtures, so run through pytest
+    raise SystemExit(pytest.main([__file__, "-m", "integration"]))
@@ -5,11 +5,19 @@ from datetime import datetime, timedelta
 import cups
 from job_queue_manager import JobQueueManager, PrintJob
 
+# Deterministic "now" for job timestamps and age calculations
+FIXED_NOW = datetime(2024, 1, 1, 12, 0, 0)
+
 class TestJobQueueManager(unittest.TestCase):
     def setUp(self):
-        self.mock_cups = Mock(spec=cups.Connection)
+        self.mock_cups = Mock(spec_set=cups.Connection)
         self.queue_manager = JobQueueManager(self.mock_cups)
 
+        # Freeze the clock seen by job_queue_manager
+        patcher = patch('job_queue_manager.datetime', Mock(spec_set=['now']))
+        patcher.start().now.return_value = FIXED_NOW
+        self.addCleanup(patcher.stop)
+
     def test_submit_job(self):
         # Setup
         self.mock_cups.printFile.return_value = 123
@@ -26,6 +34,7 @@ class TestJobQueueManager(unittest.TestCase):
         self.assertIn(123, self.queue_manager.jobs)
         self.assertEqual(self.queue_manager.jobs[123].printer_name, printer_name)
         self.assertEqual(self.queue_manager.jobs[123].status, "pending")
+        self.assertEqual(self.queue_manager.jobs[123].created_at, FIXED_NOW)
 
     def test_submit_job_error(self):
         # Setup
@@ -42,7 +51,7 @@ class TestJobQueueManager(unittest.TestCase):
             job_id=job_id,
             printer_name="test_printer",
             status="pending",
-            created_at=datetime.now()
+            created_at=FIXED_NOW
         )
         self.mock_cups.getJobs.return_value = {
             job_id: {"job-state": 3, "job-state-reasons": ["none"]}
@@ -64,7 +73,7 @@ class TestJobQueueManager(unittest.TestCase):
             job_id=job_id,
             printer_name="test_printer",
             status="printing",
-            created_at=datetime.now()
+            created_at=FIXED_NOW
         )
         self.mock_cups.getJobs.return_value = {
             job_id: {"job-state": 9, "job-state-reasons": ["processing-completed"]}
@@ -75,7 +84,7 @@ class TestJobQueueManager(unittest.TestCase):
 
         # Assert
         self.assertEqual(status["status"], "completed")
-        self.assertIsNotNone(status["completed_at"])
+        self.assertEqual(status["completed_at"], FIXED_NOW.isoformat())
 
     def test_get_job_status_not_found(self):
         # Execute
@@ -92,7 +101,7 @@ class TestJobQueueManager(unittest.TestCase):
             job_id=job_id,
             printer_name="test_printer",
             status="printing",
-            created_at=datetime.now()
+            created_at=FIXED_NOW
         )
 
         # Execute
@@ -115,7 +124,7 @@ class TestJobQueueManager(unittest.TestCase):
 
     def test_clean_old_jobs(self):
         # Setup
-        now = datetime.now()
+        now = FIXED_NOW
         old_job = PrintJob(
             job_id=1,
             printer_name="test_printer",
@@ -142,9 +151,9 @@ class TestJobQueueManager(unittest.TestCase):
     def test_get_queue_status(self):
         # Setup
         self.queue_manager.jobs = {
-            1: PrintJob(job_id=1, printer_name="p1", status="completed", created_at=datetime.now()),
-            2: PrintJob(job_id=2, printer_name="p1", status="pending", created_at=datetime.now()),
-            3: PrintJob(job_id=3, printer_name="p2", status="aborted", created_at=datetime.now())
+            1: PrintJob(job_id=1, printer_name="p1", status="completed", created_at=FIXED_NOW),
+            2: PrintJob(job_id=2, printer_name="p1", status="pending", created_at=FIXED_NOW),
+            3: PrintJob(job_id=3, printer_name="p2", status="aborted", created_at=FIXED_NOW)
         }
         self.mock_cups.getJobs.return_value = {2: {}}
 
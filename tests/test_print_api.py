@@ -1,25 +1,39 @@
 import pytest
+import io
 import json
 import os
-from unittest.mock import patch, MagicMock
+from pathlib import Path
+from unittest.mock import patch, Mock
 
 # Note: conftest.py sets up the test environment before any imports
-from print_api import app
+from print_api import app, reap_uploads, UPLOAD_FOLDER, UPLOAD_MAX_AGE
 
-@pytest.fixture
+app.config['TESTING'] = True
+
+# Read once; each upload wraps the bytes in a fresh BytesIO
+TEST_PDF = (Path(__file__).parent / 'test_data' / 'test.pdf').read_bytes()
+
+# The JobQueueManager methods the API calls
+QUEUE_MANAGER_API = ['submit_job', 'get_job_status', 'cancel_job', 'get_queue_status']
+
+@pytest.fixture(scope="module")
 def client():
-    app.config['TESTING'] = True
-    with app.test_client() as client:
-        yield client
-
-@pytest.fixture
-def auth_client():
-    """Client that simulates requests coming from HA Ingress (authenticated)."""
-    app.config['TESTING'] = True
-    with app.test_client() as client:
-        # Simulate Ingress by adding the X-Ingress-Path header
-        client.environ_base['HTTP_X_INGRESS_PATH'] = '/api/hassio_ingress/test'
-        yield client
+    """One test client for the module.
+
+    Used without `with`, so no request context is kept between tests.
+    """
+    return app.test_client()
+
+@pytest.fixture(params=['ingress', 'bearer'])
+def authed_client(request, client):
+    """Client plus the headers for each way a request can authenticate."""
+    if request.param == 'ingress':
+        # Requests proxied by HA Ingress carry the X-Ingress-Path header
+        yield client, {'X-Ingress-Path': '/api/hassio_ingress/test'}
+    else:
+        # Bearer tokens are validated against HA, which accepts this one
+        with patch('print_api.validate_ha_token', return_value=True):
+            yield client, {'Authorization': 'Bearer test-token'}
 
 def test_health_check(client):
     """Test health check endpoint."""
@@ -31,23 +45,25 @@ def test_health_check(client):
     assert 'version' in data
 
 @patch('print_api.get_printers')
-def test_list_printers(mock_get_printers, auth_client):
+def test_list_printers(mock_get_printers, authed_client):
     """Test listing available printers."""
+    client, headers = authed_client
     mock_printers = [
         {'name': 'Printer1', 'status': 'idle'},
         {'name': 'Printer2', 'status': 'printing'}
     ]
     mock_get_printers.return_value = mock_printers
 
-    response = auth_client.get('/api/printers')
+    response = client.get('/api/printers', headers=headers)
     assert response.status_code == 200
     data = json.loads(response.data)
     assert data['printers'] == mock_printers
 
 @patch('job_queue_manager.get_queue_manager')
-def test_submit_print_job(mock_get_queue_manager, auth_client):
+def test_submit_print_job(mock_get_queue_manager, authed_client):
     """Test submitting a print job."""
-    mock_queue_manager = MagicMock()
+    client, headers = authed_client
+    mock_queue_manager = Mock(spec_set=QUEUE_MANAGER_API)
     mock_get_queue_manager.return_value = mock_queue_manager
     mock_queue_manager.submit_job.return_value = 123
 
@@ -56,25 +72,23 @@ def test_submit_print_job(mock_get_queue_manager, auth_client):
         'copies': '2',
         'duplex': 'true'
     }
-    test_file = (open('tests/test_data/test.pdf', 'rb') if os.path.exists('tests/test_data/test.pdf')
-                 else open('test_data/test.pdf', 'rb'))
-
-    response = auth_client.post(
+    response = client.post(
         '/api/print',
-        data={**data, 'file': (test_file, 'test.pdf')},
+        headers=headers,
+        data={**data, 'file': (io.BytesIO(TEST_PDF), 'test.pdf')},
         content_type='multipart/form-data'
     )
 
-    test_file.close()
     assert response.status_code == 200
     data = json.loads(response.data)
     assert data['job_id'] == 123
     assert data['status'] == 'submitted'
 
 @patch('job_queue_manager.get_queue_manager')
-def test_get_job_status(mock_get_queue_manager, auth_client):
+def test_get_job_status(mock_get_queue_manager, authed_client):
     """Test getting job status."""
-    mock_queue_manager = MagicMock()
+    client, headers = authed_client
+    mock_queue_manager = Mock(spec_set=QUEUE_MANAGER_API)
     mock_get_queue_manager.return_value = mock_queue_manager
     mock_status = {
         'job_id': 123,
@@ -83,27 +97,29 @@ def test_get_job_status(mock_get_queue_manager, auth_client):
     }
     mock_queue_manager.get_job_status.return_value = mock_status
 
-    response = auth_client.get('/api/print/123/status')
+    response = client.get('/api/print/123/status', headers=headers)
     assert response.status_code == 200
     data = json.loads(response.data)
     assert data == mock_status
 
 @patch('job_queue_manager.get_queue_manager')
-def test_cancel_job(mock_get_queue_manager, auth_client):
+def test_cancel_job(mock_get_queue_manager, authed_client):
     """Test canceling a print job."""
-    mock_queue_manager = MagicMock()
+    client, headers = authed_client
+    mock_queue_manager = Mock(spec_set=QUEUE_MANAGER_API)
     mock_get_queue_manager.return_value = mock_queue_manager
     mock_queue_manager.cancel_job.return_value = True
 
-    response = auth_client.delete('/api/print/123')
+    response = client.delete('/api/print/123', headers=headers)
     assert response.status_code == 200
     data = json.loads(response.data)
     assert data['message'] == 'Job canceled successfully'
 
 @patch('job_queue_manager.get_queue_manager')
-def test_get_queue_status(mock_get_queue_manager, auth_client):
+def test_get_queue_status(mock_get_queue_manager, authed_client):
     """Test getting queue status."""
-    mock_queue_manager = MagicMock()
+    client, headers = authed_client
+    mock_queue_manager = Mock(spec_set=QUEUE_MANAGER_API)
     mock_get_queue_manager.return_value = mock_queue_manager
     mock_status = {
         'active_jobs': 2,
@@ -112,7 +128,7 @@ def test_get_queue_status(mock_get_queue_manager, auth_client):
     }
     mock_queue_manager.get_queue_status.return_value = mock_status
 
-    response = auth_client.get('/api/queue/status')
+    response = client.get('/api/queue/status', headers=headers)
     assert response.status_code == 200
     data = json.loads(response.data)
     assert data == mock_status
@@ -124,24 +140,24 @@ def test_not_found(client):
     data = json.loads(response.data)
     assert data['error'] == 'Not found'
 
-def test_submit_print_job_no_file(auth_client):
+def test_submit_print_job_no_file(authed_client):
     """Test submitting without a file."""
-    response = auth_client.post('/api/print', data={'printer_name': 'TestPrinter'})
+    client, headers = authed_client
+    response = client.post('/api/print', headers=headers,
+                           data={'printer_name': 'TestPrinter'})
     assert response.status_code == 400
     data = json.loads(response.data)
     assert 'No file' in data['error']
 
-def test_submit_print_job_no_printer(auth_client):
+def test_submit_print_job_no_printer(authed_client):
     """Test submitting without specifying printer."""
-    test_file = (open('tests/test_data/test.pdf', 'rb') if os.path.exists('tests/test_data/test.pdf')
-                 else open('test_data/test.pdf', 'rb'))
-
-    response = auth_client.post(
+    client, headers = authed_client
+    response = client.post(
         '/api/print',
-        data={'file': (test_file, 'test.pdf')},
+        headers=headers,
+        data={'file': (io.BytesIO(TEST_PDF), 'test.pdf')},
         content_type='multipart/form-data'
     )
-    test_file.close()
 
     assert response.status_code == 400
     data = json.loads(response.data)
@@ -154,3 +170,21 @@ def test_unauthenticated_request(client):
     assert response.status_code == 401
     data = json.loads(response.data)
     assert 'error' in data
+
+
+def test_reap_uploads():
+    """Test that only uploads older than UPLOAD_MAX_AGE are removed."""
+    old_file = os.path.join(UPLOAD_FOLDER, 'old.pdf')
+    new_file = os.path.join(UPLOAD_FOLDER, 'new.pdf')
+    for path in (old_file, new_file):
+        with open(path, 'wb') as f:
+            f.write(b'%PDF-1.1')
+    old_time = os.path.getmtime(old_file) - UPLOAD_MAX_AGE - 1
+    os.utime(old_file, (old_time, old_time))
+
+    reap_uploads()
+
+    assert not os.path.exists(old_file)
+    assert os.path.exists(new_file)
+    os.unlink(new_file)
+
@@ -1,144 +1,190 @@
 #!/usr/bin/env python3
 """Unit tests for printer discovery functionality."""
-import unittest
-from unittest.mock import MagicMock, patch
-import sys
-import os
+import pytest
+import threading
+import time
+from types import MappingProxyType
+from unittest.mock import Mock, patch
 
-# Add the parent directory to the Python path so we can import the script
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'rootfs', 'usr', 'local', 'bin'))
-import printer_discovery
+# The cups.Connection methods PrinterDiscovery calls
+CUPS_CONNECTION_API = ['getPrinters', 'getPrinterAttributes', 'getDefault']
 
-class TestPrinterDiscovery(unittest.TestCase):
-    """Test cases for printer discovery functionality."""
+# Queues of both connection types, as returned by getPrinters()
+MOCK_PRINTERS = MappingProxyType({
+    'network1': {'device-uri': 'ipp://printer1'},
+    'network2': {'device-uri': 'socket://printer2'},
+    'local1': {'device-uri': 'usb://printer3'},
+    'local2': {'device-uri': 'parallel://printer4'},
+})
+
+@pytest.fixture(scope="session")
+def attrs_template():
+    """getPrinterAttributes() fields shared by every mocked queue."""
+    return MappingProxyType({
+        'printer-info': 'Test Printer',
+        'printer-location': 'Office',
+        'printer-make-and-model': 'Test Model',
+        'printer-state': 3,
+        'printer-state-message': 'Idle',
+        'printer-is-shared': True,
+        'document-format-supported': ['application/pdf']
+    })
+
+@pytest.fixture(scope="session")
+def mock_attrs(attrs_template):
+    """getPrinterAttributes() results for MOCK_PRINTERS."""
+    return MappingProxyType({
+        name: {**attrs_template, 'device-uri': data['device-uri']}
+        for name, data in MOCK_PRINTERS.items()
+    })
+
+@pytest.fixture(scope="module")
+def printer_discovery():
+    """The module under test, imported when first needed.
 
-    def setUp(self):
-        """Set up test fixtures."""
-        self.mock_conn = MagicMock()
-        with patch('cups.Connection', return_value=self.mock_conn):
-            self.discovery = printer_discovery.PrinterDiscovery()
+    Deferring the import keeps collection from loading the cups C
+    extension. conftest.py puts rootfs/usr/local/bin on sys.path.
+    """
+    import printer_discovery
+    return printer_discovery
 
-    def test_get_all_printers(self):
+@pytest.fixture(scope="class")
+def cups_env(printer_discovery):
+    """Patch cups.Connection once per class and share one PrinterDiscovery."""
+    mock_conn = Mock(spec_set=CUPS_CONNECTION_API)
+    with patch('printer_discovery.cups.Connection', return_value=mock_conn):
+        yield mock_conn, printer_discovery.PrinterDiscovery()
+
+@pytest.fixture
+def mock_conn(cups_env):
+    """Mocked CUPS connection, reset so no test sees another's setup."""
+    mock_conn = cups_env[0]
+    mock_conn.reset_mock(return_value=True, side_effect=True)
+    return mock_conn
+
+@pytest.fixture
+def discovery(cups_env, mock_conn):
+    """PrinterDiscovery wired to the mocked CUPS connection."""
+    discovery = cups_env[1]
+    discovery.clear_cache()
+    return discovery
+
+class TestPrinterDiscovery:
+    """Test cases for printer discovery functionality."""
+
+    def test_get_all_printers(self, mock_conn, discovery):
         """Test getting all printers."""
-        # Mock printer data
-        mock_printers = {
-            'printer1': {'device-uri': 'usb://printer1'},
-            'printer2': {'device-uri': 'ipp://printer2'}
-        }
-        self.mock_conn.getPrinters.return_value = mock_printers
-        
-        printers = self.discovery.get_all_printers()
-        self.assertEqual(printers, mock_printers)
-        self.mock_conn.getPrinters.assert_called_once()
-
-    def test_get_printer_attributes(self):
+        mock_conn.getPrinters.return_value = MOCK_PRINTERS
+
+        printers = discovery.get_all_printers()
+        assert printers == MOCK_PRINTERS
+        assert mock_conn.getPrinters.call_count == 1
+
+    def test_get_printer_attributes(self, mock_conn, discovery, attrs_template):
         """Test getting printer attributes."""
         printer_name = 'test_printer'
-        mock_attrs = {
-            'printer-info': 'Test Printer',
-            'printer-location': 'Office',
-            'printer-make-and-model': 'Test Model',
-            'printer-state': 3,
-            'printer-state-message': 'Idle',
-            'printer-is-shared': True,
-            'device-uri': 'usb://test_printer',
-            'document-format-supported': ['application/pdf']
-        }
-        self.mock_conn.getPrinterAttributes.return_value = mock_attrs
-        
-        attrs = self.discovery.get_printer_attributes(printer_name)
-        self.assertEqual(attrs['name'], printer_name)
-        self.assertEqual(attrs['info'], 'Test Printer')
-        self.assertEqual(attrs['location'], 'Office')
-        self.assertEqual(attrs['make_model'], 'Test Model')
-        self.assertEqual(attrs['state'], 3)
-        self.assertEqual(attrs['state_message'], 'Idle')
-        self.assertEqual(attrs['is_shared'], True)
-        self.assertEqual(attrs['uri'], 'usb://test_printer')
-        self.assertEqual(attrs['supported_formats'], ['application/pdf'])
-
-    def test_discover_network_printers(self):
-        """Test network printer discovery."""
-        mock_printers = {
-            'network1': {'device-uri': 'ipp://printer1'},
-            'network2': {'device-uri': 'socket://printer2'},
-            'local1': {'device-uri': 'usb://printer3'}
-        }
-        self.mock_conn.getPrinters.return_value = mock_printers
-        
-        # Mock printer attributes
-        def mock_get_attrs(name):
-            return {
-                'printer-info': f'Info for {name}',
-                'printer-location': 'Network',
-                'printer-make-and-model': 'Network Printer',
-                'printer-state': 3,
-                'printer-state-message': 'Idle',
-                'printer-is-shared': True,
-                'device-uri': mock_printers[name]['device-uri'],
-                'document-format-supported': ['application/pdf']
-            }
-        
-        self.mock_conn.getPrinterAttributes.side_effect = mock_get_attrs
-        
-        network_printers = self.discovery.discover_network_printers()
-        self.assertEqual(len(network_printers), 2)
-        uris = [p['uri'] for p in network_printers]
-        self.assertIn('ipp://printer1', uris)
-        self.assertIn('socket://printer2', uris)
-
-    def test_discover_local_printers(self):
-        """Test local printer discovery."""
-        mock_printers = {
-            'local1': {'device-uri': 'usb://printer1'},
-            'local2': {'device-uri': 'parallel://printer2'},
-            'network1': {'device-uri': 'ipp://printer3'}
-        }
-        self.mock_conn.getPrinters.return_value = mock_printers
-        
-        # Mock printer attributes
-        def mock_get_attrs(name):
-            return {
-                'printer-info': f'Info for {name}',
-                'printer-location': 'Local',
-                'printer-make-and-model': 'Local Printer',
-                'printer-state': 3,
-                'printer-state-message': 'Idle',
-                'printer-is-shared': False,
-                'device-uri': mock_printers[name]['device-uri'],
-                'document-format-supported': ['application/pdf']
-            }
-        
-        self.mock_conn.getPrinterAttributes.side_effect = mock_get_attrs
-        
-        local_printers = self.discovery.discover_local_printers()
-        self.assertEqual(len(local_printers), 2)
-        uris = [p['uri'] for p in local_printers]
-        self.assertIn('usb://printer1', uris)
-        self.assertIn('parallel://printer2', uris)
-
-    def test_get_default_printer(self):
+        mock_conn.getPrinterAttributes.return_value = {
+            **attrs_template, 'device-uri': 'usb://test_printer'}
+
+        attrs = discovery.get_printer_attributes(printer_name)
+        assert attrs['name'] == printer_name
+        assert attrs['info'] == 'Test Printer'
+        assert attrs['location'] == 'Office'
+        assert attrs['make_model'] == 'Test Model'
+        assert attrs['state'] == 3
+        assert attrs['state_message'] == 'Idle'
+        assert attrs['is_shared'] is True
+        assert attrs['uri'] == 'usb://test_printer'
+        assert attrs['supported_formats'] == ['application/pdf']
+
+    def test_get_printer_attributes_cached(self, mock_conn, discovery, mock_attrs):
+        """Test that attributes are fetched once until the cache is cleared."""
+        mock_conn.getPrinterAttributes.side_effect = mock_attrs.__getitem__
+
+        first = discovery.get_printer_attributes('network1')
+        assert discovery.get_printer_attributes('network1') == first
+        assert mock_conn.getPrinterAttributes.call_count == 1
+
+        discovery.clear_cache()
+        discovery.get_printer_attributes('network1')
+        assert mock_conn.getPrinterAttributes.call_count == 2
+
+    @pytest.mark.parametrize("kind,expected", [
+        ("network", {'ipp://printer1', 'socket://printer2'}),
+        ("local", {'usb://printer3', 'parallel://printer4'}),
+    ])
+    def test_discover_printers(self, mock_conn, discovery, mock_attrs, kind, expected):
+        """Test network and local printer discovery."""
+        mock_conn.getPrinters.return_value = MOCK_PRINTERS
+        mock_conn.getPrinterAttributes.side_effect = mock_attrs.__getitem__
+
+        printers = getattr(discovery, f"discover_{kind}_printers")()
+        assert {p['uri'] for p in printers} == expected
+        assert len(printers) == len(expected)
+
+        # Attributes are only fetched for queues that passed the URI filter
+        fetched = [c.args[0] for c in mock_conn.getPrinterAttributes.call_args_list]
+        assert sorted(fetched) == sorted(p['name'] for p in printers)
+
+    def test_discover_printers_keeps_queue_order(self, mock_conn, discovery):
+        """Test that concurrent attribute fetches keep getPrinters() order."""
+        printers = {f'network{i}': {'device-uri': f'ipp://printer{i}'} for i in range(8)}
+        mock_conn.getPrinters.return_value = printers
+
+        # Later queues answer first, so fetches complete in reverse order
+        def get_attrs(name):
+            time.sleep(0.001 * (len(printers) - int(name[len('network'):])))
+            return printers[name]
+
+        mock_conn.getPrinterAttributes.side_effect = get_attrs
+
+        result = discovery.discover_network_printers()
+        assert [p['name'] for p in result] == list(printers)
+
+    def test_discover_printers_reuses_worker_connections(
+            self, mock_conn, discovery, mock_attrs, printer_discovery):
+        """Test that repeated discovery doesn't open new CUPS connections."""
+        mock_conn.getPrinters.return_value = MOCK_PRINTERS
+        mock_conn.getPrinterAttributes.side_effect = mock_attrs.__getitem__
+
+        discovery.discover_network_printers()
+        opened = printer_discovery.cups.Connection.call_count
+        discovery.clear_cache()
+        discovery.discover_network_printers()
+        assert printer_discovery.cups.Connection.call_count == opened
+
+    def test_non_pool_threads_share_connection(
+            self, mock_conn, discovery, mock_attrs, printer_discovery):
+        """Test that threads outside the discovery pool use discovery.conn."""
+        mock_conn.getPrinterAttributes.side_effect = mock_attrs.__getitem__
+
+        opened = printer_discovery.cups.Connection.call_count
+        thread = threading.Thread(target=discovery.get_printer_attributes, args=('network1',))
+        thread.start()
+        thread.join()
+        assert printer_discovery.cups.Connection.call_count == opened
+        assert mock_conn.getPrinterAttributes.call_count == 1
+
+    def test_get_default_printer(self, mock_conn, discovery):
         """Test getting default printer."""
         default_printer = 'default_printer'
-        self.mock_conn.getDefault.return_value = default_printer
-        
-        result = self.discovery.get_default_printer()
-        self.assertEqual(result, default_printer)
-        self.mock_conn.getDefault.assert_called_once()
+        mock_conn.getDefault.return_value = default_printer
 
-    def test_get_default_printer_none(self):
+        result = discovery.get_default_printer()
+        assert result == default_printer
+        assert mock_conn.getDefault.call_count == 1
+
+    def test_get_default_printer_none(self, mock_conn, discovery):
         """Test getting default printer when none is set."""
-        self.mock_conn.getDefault.return_value = None
-        
-        result = self.discovery.get_default_printer()
-        self.assertIsNone(result)
-        self.mock_conn.getDefault.assert_called_once()
+        mock_conn.getDefault.return_value = None
 
-    def test_connection_error(self):
-        """Test handling of CUPS connection error."""
-        with patch('cups.Connection', side_effect=Exception("Connection failed")):
-            with self.assertRaises(SystemExit):
-                printer_discovery.PrinterDiscovery()
+        result = discovery.get_default_printer()
+        assert result is None
+        assert mock_conn.getDefault.call_count == 1
 
-if __name__ == '__main__':
-    unittest.main() 
\ No newline at end of file
+    def test_connection_error(self, printer_discovery):
+        """Test handling of CUPS connection error."""
+        with patch('printer_discovery.cups.Connection', side_effect=Exception("Connection failed")), \
+                patch('printer_discovery.sys.exit') as mock_exit:
+            printer_discovery.PrinterDiscovery()
+        mock_exit.assert_called_once_with(1)
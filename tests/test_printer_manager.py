@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Unit tests for the printer manager dashboard API."""
+import pytest
+import json
+from unittest.mock import Mock, patch
+
+# The cups.Connection methods the printer manager calls
+CUPS_CONNECTION_API = [
+    'getPrinters', 'getPrinterAttributes', 'getDefault', 'getJobs', 'createJob',
+    'startDocument', 'writeRequestData', 'finishDocument', 'cancelJob'
+]
+
+PRINTERS = {
+    'Office': {'printer-info': 'Office Printer', 'printer-state': 3,
+               'device-uri': 'ipp://office.local/ipp/print'},
+    'Lab': {'printer-info': 'Lab Printer', 'printer-state': 4,
+            'device-uri': 'usb://Lab/Printer'},
+}
+
+@pytest.fixture(scope="module")
+def printer_manager():
+    """printer_manager imported with its PrinterDiscovery on a mocked CUPS."""
+    with patch('printer_discovery.cups.Connection',
+               return_value=Mock(spec_set=CUPS_CONNECTION_API)):
+        import printer_manager
+    return printer_manager
+
+@pytest.fixture
+def mock_conn(printer_manager):
+    """Fresh mocked CUPS connection for each test."""
+    mock_conn = Mock(spec_set=CUPS_CONNECTION_API)
+    with patch.object(printer_manager.printer_discovery, 'conn', mock_conn):
+        yield mock_conn
+
+@pytest.fixture(scope="module")
+def client(printer_manager):
+    return printer_manager.app.test_client()
+
+def test_get_printers_groups_active_jobs(mock_conn, client):
+    """Test that active jobs are matched to printers by job-printer-uri."""
+    mock_conn.getPrinters.return_value = PRINTERS
+    mock_conn.getJobs.return_value = {
+        1: {'job-name': 'report', 'job-state': 5,
+            'job-printer-uri': 'ipp://localhost:631/printers/Office'},
+        2: {'job-name': 'labels', 'job-state': 3,
+            'job-printer-uri': 'ipp://localhost:631/printers/Lab'},
+        3: {'job-name': 'draft', 'job-state': 4,
+            'job-printer-uri': 'ipp://localhost:631/printers/Office'},
+    }
+
+    response = client.get('/api/printers')
+    assert response.status_code == 200
+    printers = {p['name']: p for p in json.loads(response.data)['printers']}
+
+    assert printers['Office']['active_jobs'] == [
+        {'id': 1, 'name': 'report', 'progress': 50},
+        {'id': 3, 'name': 'draft', 'progress': 25},
+    ]
+    assert printers['Lab']['active_jobs'] == [
+        {'id': 2, 'name': 'labels', 'progress': 0},
+    ]
+    assert printers['Office']['info'] == 'Office Printer'
+    assert 'supported_formats' not in printers['Office']
+    assert mock_conn.getJobs.call_count == 1
+
+def test_get_printers_jobs_failure(mock_conn, client):
+    """Test that a failing getJobs leaves every printer without active jobs."""
+    mock_conn.getPrinters.return_value = PRINTERS
+    mock_conn.getJobs.side_effect = RuntimeError("CUPS unavailable")
+
+    response = client.get('/api/printers')
+    assert response.status_code == 200
+    printers = json.loads(response.data)['printers']
+    assert sorted(p['name'] for p in printers) == ['Lab', 'Office']
+    assert all(p['active_jobs'] == [] for p in printers)
+
+def test_test_print(mock_conn, client):
+    """Test that a test page is streamed to the printer as one job."""
+    mock_conn.createJob.return_value = 7
+
+    response = client.post('/api/printer/Office/test-print')
+    assert response.status_code == 200
+    assert json.loads(response.data) == {'success': True, 'job_id': 7}
+    mock_conn.finishDocument.assert_called_once_with('Office')
+    mock_conn.cancelJob.assert_not_called()
+
+def test_test_print_cancels_failed_job(mock_conn, client):
+    """Test that a job whose page fails to stream is cancelled."""
+    mock_conn.createJob.return_value = 7
+    mock_conn.writeRequestData.side_effect = RuntimeError("Stream failed")
+
+    response = client.post('/api/printer/Office/test-print')
+    assert response.status_code == 500
+    assert 'error' in json.loads(response.data)
+    mock_conn.cancelJob.assert_called_once_with(7)
+    mock_conn.finishDocument.assert_not_called()